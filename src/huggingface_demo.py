@@ -1,8 +1,20 @@
 import os
+import random
+import asyncio
 from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
+from huggingface_hub import AsyncInferenceClient
 
-def main():
+async def retry_with_jitter(fn, attempts=4, base=0.5, cap=30.0):
+    """Await fn(), retrying failures with exponential backoff and full jitter"""
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+            await asyncio.sleep(random.uniform(0, min(cap, base * (2 ** attempt))))
+
+async def main():
     load_dotenv()
     api_token = os.getenv("HF_TOKEN")
     
@@ -10,7 +22,7 @@ def main():
         print("Error: HF_TOKEN environment variable not set")
         return
     
-    client = InferenceClient(token=api_token)
+    client = AsyncInferenceClient(token=api_token)
     
     print("=== Working Hugging Face Models Demo ===\n")
     
@@ -18,7 +30,7 @@ def main():
     print("1. Text Generation")
     print("-" * 30)
     try:
-        result = client.text_generation(
+        result = await client.text_generation(
             prompt="The capital of France is",
             model="microsoft/DialoGPT-medium",
             max_new_tokens=20
@@ -31,7 +43,7 @@ def main():
     print("\n2. Sentiment Analysis")
     print("-" * 30)
     try:
-        result = client.text_classification(
+        result = await client.text_classification(
             text="I love this demo!",
             model="cardiffnlp/twitter-roberta-base-sentiment-latest"
         )
@@ -52,27 +64,40 @@ def main():
         "bert-large-uncased-whole-word-masking-finetuned-squad"
     ]
     
+    # Race all models and keep the first successful answer
+    tasks = {
+        asyncio.create_task(retry_with_jitter(lambda model=model: client.question_answering(
+            question=question,
+            context=context,
+            model=model
+        ))): model
+        for model in qa_models_to_try
+    }
+    
     qa_success = False
-    for model in qa_models_to_try:
-        try:
-            result = client.question_answering(
-                question=question,
-                context=context,
-                model=model
-            )
+    pending = set(tasks)
+    while pending and not qa_success:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            model = tasks[task]
+            if task.exception():
+                print(f"❌ QA failed with {model}: {task.exception()}")
+                continue
+            result = task.result()
             print(f"✅ QA Success with {model}")
             print(f"Answer: {result['answer']}")
             print(f"Score: {result['score']:.4f}")
             qa_success = True
             break
-        except Exception as e:
-            print(f"❌ QA failed with {model}: {e}")
+    
+    for task in pending:
+        task.cancel()
     
     if not qa_success:
         print("Trying QA with text generation instead...")
         try:
             prompt = f"Context: {context}\nQuestion: {question}\nAnswer:"
-            result = client.text_generation(
+            result = await client.text_generation(
                 prompt=prompt,
                 model="microsoft/DialoGPT-medium",
                 max_new_tokens=30
@@ -82,4 +107,4 @@ def main():
             print(f"❌ Text generation QA failed: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
\ No newline at end of file
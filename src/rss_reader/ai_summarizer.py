@@ -1,34 +1,135 @@
 import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from itertools import islice
 from typing import List, Dict, Optional
-from huggingface_hub import InferenceClient
+from huggingface_hub import InferenceClient, AsyncInferenceClient
 import logging
 
+try:
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    _vectorizer = TfidfVectorizer(stop_words='english', max_features=5000)
+except ImportError:
+    _vectorizer = None
+_vectorizer_lock = threading.Lock()
+
+_SENT_RE = re.compile(r'(?<=[.!?])\s+')
+
+HF_SUMMARIZATION_MODELS = [
+    "facebook/bart-large-cnn",
+    "t5-base",
+    "google/pegasus-xsum"
+]
+
+def _backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def _retry_with_jitter(fn, attempts: int = 4, base: float = 0.5, cap: float = 30.0):
+    """Call fn(), retrying failures with jittered exponential backoff"""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            delay = _backoff_delay(attempt, base, cap)
+            logging.debug(f"Attempt {attempt + 1} failed ({e}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+async def _retry_with_jitter_async(fn, attempts: int = 4, base: float = 0.5, cap: float = 30.0):
+    """Async variant of _retry_with_jitter; fn returns an awaitable"""
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            delay = _backoff_delay(attempt, base, cap)
+            logging.debug(f"Attempt {attempt + 1} failed ({e}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+SUMMARY_MEMO_SIZE = 1024
+
+# Articles summarized at once, and the time budget for each
+MAX_CONCURRENT_SUMMARIES = 4
+SUMMARY_TIMEOUT = 45
+
+# Articles per batched OpenAI request, and the prompt size a batch may grow to
+SUMMARY_BATCH_SIZE = 8
+BATCH_PROMPT_MAX_CHARS = 24000
+
+# Sent first and kept identical across requests so the cached prompt prefix is reused
+BATCH_SYSTEM_PROMPT = (
+    "You are a helpful assistant that summarizes news articles. "
+    "You will receive several articles, each introduced by a line like [ARTICLE 3]. "
+    "Summarize each article in 2-3 sentences. Reply with JSON only, in the form "
+    '{"summaries": [{"id": 3, "summary": "..."}]}, with one entry per article id.'
+)
+
+# Content shorter than this is already summary sized
+PASSTHROUGH_MAX_LENGTH = 400
+# Content within this factor of the feed description adds little over it
+DESCRIPTION_LENGTH_RATIO = 1.3
+
+# Circuit breaker: after this many consecutive failures a model is skipped for a while
+MODEL_FAILURE_THRESHOLD = 3
+MODEL_BLACKLIST_SECONDS = 300
+
 class AISummarizer:
-    def __init__(self):
+    def __init__(self, db=None):
+        self.db = db
+        self._summary_memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self._model_state = {
+            model: {'failures': 0, 'successes': 0, 'blacklist_until': 0.0}
+            for model in HF_SUMMARIZATION_MODELS
+        }
+        self._model_lock = threading.Lock()
+        
         self.hf_token = os.getenv('HF_TOKEN')
         self.openai_key = os.getenv('OPENAI_API_KEY')
         
         if self.hf_token:
             self.hf_client = InferenceClient(token=self.hf_token)
+            self.hf_async = AsyncInferenceClient(token=self.hf_token)
         else:
             self.hf_client = None
+            self.hf_async = None
             
         # Initialize OpenAI client if available
         if self.openai_key:
             try:
                 import openai
-                self.openai_client = openai.OpenAI(api_key=self.openai_key)
+                # Bound each HTTP request so a worker thread can't hang on a slow call
+                self.openai_client = openai.OpenAI(api_key=self.openai_key, timeout=SUMMARY_TIMEOUT)
             except ImportError:
                 logging.warning("OpenAI library not installed")
                 self.openai_client = None
         else:
             self.openai_client = None
     
-    def summarize_article(self, content: str, title: str = "") -> Optional[Dict]:
+    def summarize_article(self, content: str, title: str = "", description: str = "") -> Optional[Dict]:
         """Summarize a single article"""
         if not content or len(content) < 100:
             return None
         
+        content_hash = self._content_hash(content, title)
+        cached = self._get_cached(content_hash, content)
+        if cached:
+            return cached
+        
+        shortcut = self._shortcut_summary(content, description)
+        if shortcut:
+            return self._remember(content_hash, content, *shortcut)
+        
         # Try different summarization methods
         summary = None
         method_used = None
@@ -50,13 +151,96 @@ class AISummarizer:
             summary = self.extract_key_sentences(content)
             method_used = "extractive"
         
+        return self._remember(content_hash, content, summary, method_used)
+    
+    @staticmethod
+    def _shortcut_summary(content: str, description: str = ""):
+        """Return (summary, method) when calling a model isn't worth it"""
+        if len(content) < PASSTHROUGH_MAX_LENGTH:
+            return content, "passthrough"
+        
+        # Content that is the description itself still needs summarizing
+        if description and content != description and len(content) < DESCRIPTION_LENGTH_RATIO * len(description):
+            return description, "description"
+        
+        return None
+    
+    @staticmethod
+    def _content_hash(content: str, title: str = "") -> str:
+        return hashlib.sha256((title + content).encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def _summary_result(content: str, summary: str, method: str) -> Dict:
         return {
             'summary': summary,
-            'method': method_used,
+            'method': method,
             'original_length': len(content),
             'summary_length': len(summary) if summary else 0
         }
     
+    def _get_cached(self, content_hash: str, content: str) -> Optional[Dict]:
+        """Return a memoized summary, checking memory before the database"""
+        with self._memo_lock:
+            cached = self._summary_memo.get(content_hash)
+            if cached:
+                self._summary_memo.move_to_end(content_hash)
+        
+        if not cached and self.db:
+            cached = self.db.get_cached_summary(content_hash)
+            if cached:
+                self._memoize(content_hash, cached)
+        
+        if not cached:
+            return None
+        
+        logging.debug(f"Summary cache hit for {content_hash[:12]}")
+        return self._summary_result(content, cached['summary'], cached['method'])
+    
+    def _memoize(self, content_hash: str, cached: Dict):
+        with self._memo_lock:
+            self._summary_memo[content_hash] = cached
+            self._summary_memo.move_to_end(content_hash)
+            if len(self._summary_memo) > SUMMARY_MEMO_SIZE:
+                self._summary_memo.popitem(last=False)
+    
+    def _remember(self, content_hash: str, content: str, summary: str, method: str) -> Dict:
+        """Cache a freshly generated summary and build the result dict"""
+        # Extractive output is only a stand-in for a failed remote call,
+        # so leave it uncached and let the next run try the models again
+        if summary and method != "extractive":
+            self._memoize(content_hash, {'summary': summary, 'method': method})
+            if self.db:
+                self.db.save_cached_summary(content_hash, summary, method)
+        
+        return self._summary_result(content, summary, method)
+    
+    def _models_to_try(self) -> List[str]:
+        """HF models ordered by recent health, skipping blacklisted ones"""
+        now = time.time()
+        with self._model_lock:
+            available = [
+                model for model in HF_SUMMARIZATION_MODELS
+                if self._model_state[model]['blacklist_until'] <= now
+            ]
+            return sorted(available, key=lambda m: (
+                self._model_state[m]['failures'],
+                -self._model_state[m]['successes']
+            ))
+    
+    def _record_model_result(self, model: str, success: bool):
+        """Update the circuit breaker state for a model"""
+        with self._model_lock:
+            state = self._model_state[model]
+            if success:
+                state['failures'] = 0
+                state['successes'] += 1
+                return
+            
+            state['failures'] += 1
+            if state['failures'] >= MODEL_FAILURE_THRESHOLD:
+                state['blacklist_until'] = time.time() + MODEL_BLACKLIST_SECONDS
+                logging.warning(f"HF model {model} failed {state['failures']} times in a row, skipping it for {MODEL_BLACKLIST_SECONDS}s")
+    
     def summarize_with_hf(self, content: str) -> Optional[str]:
         """Summarize using Hugging Face"""
         try:
@@ -65,28 +249,59 @@ class AISummarizer:
             if len(content) > max_length:
                 content = content[:max_length] + "..."
             
-            models_to_try = [
-                "facebook/bart-large-cnn",
-                "t5-base",
-                "google/pegasus-xsum"
-            ]
-            
-            for model in models_to_try:
+            for model in self._models_to_try():
                 try:
-                    result = self.hf_client.summarization(
+                    result = _retry_with_jitter(lambda: self.hf_client.summarization(
                         text=content,
                         model=model,
                         max_length=150,
                         min_length=50
-                    )
+                    ))
                     
-                    if isinstance(result, list) and len(result) > 0:
-                        return result[0].get('summary_text', '')
-                    elif isinstance(result, dict):
-                        return result.get('summary_text', '')
+                    summary = self._summary_text(result)
+                    if summary is not None:
+                        self._record_model_result(model, True)
+                        return summary
                         
                 except Exception as e:
                     logging.debug(f"HF model {model} failed: {e}")
+                    self._record_model_result(model, False)
+                    continue
+            
+            return None
+            
+        except Exception as e:
+            logging.error(f"HF summarization error: {e}")
+            return None
+    
+    async def _summarize_one_async(self, content: str, model: str) -> Optional[str]:
+        """Summarize with a single Hugging Face model without blocking the event loop"""
+        result = await self.hf_async.summarization(
+            text=content,
+            model=model,
+            max_length=150,
+            min_length=50
+        )
+        return self._summary_text(result)
+    
+    async def summarize_with_hf_async(self, content: str) -> Optional[str]:
+        """Async variant of summarize_with_hf"""
+        try:
+            max_length = 3000
+            if len(content) > max_length:
+                content = content[:max_length] + "..."
+            
+            for model in self._models_to_try():
+                try:
+                    summary = await _retry_with_jitter_async(
+                        lambda: self._summarize_one_async(content, model)
+                    )
+                    if summary is not None:
+                        self._record_model_result(model, True)
+                        return summary
+                except Exception as e:
+                    logging.debug(f"HF model {model} failed: {e}")
+                    self._record_model_result(model, False)
                     continue
             
             return None
@@ -95,6 +310,159 @@ class AISummarizer:
             logging.error(f"HF summarization error: {e}")
             return None
     
+    async def summarize_articles_batch_async(self, articles: List[Dict], batch_size: int = SUMMARY_BATCH_SIZE,
+                                             semaphore: Optional[asyncio.Semaphore] = None) -> List[Optional[Dict]]:
+        """Summarize several articles, preserving input order.
+        
+        HF models are tried per article, then the rest go to OpenAI as one request per batch,
+        then extraction. Pass one semaphore to all concurrent callers to share the request limit.
+        """
+        # Tighter than extraction to stay inside upstream rate limits
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_SUMMARIES)
+        
+        results, pending = self._start_batch(articles)
+        
+        async def summarize_with_hf(content: str) -> Optional[str]:
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(self.summarize_with_hf_async(content), SUMMARY_TIMEOUT)
+                except asyncio.TimeoutError:
+                    logging.warning(f"Timed out summarizing with HF after {SUMMARY_TIMEOUT}s")
+                    return None
+        
+        # The client times out each request itself, so the threads always finish
+        # and hold their semaphore slot for as long as they run
+        async def summarize_chunk_with_openai(chunk: List[Dict]) -> Optional[List[Optional[str]]]:
+            async with semaphore:
+                return await asyncio.to_thread(self.summarize_batch_with_openai, chunk)
+        
+        async def summarize_one_with_openai(item: Dict) -> Optional[str]:
+            async with semaphore:
+                return await asyncio.to_thread(self.summarize_with_openai, item['content'], item['title'])
+        
+        if pending and self.hf_async:
+            summaries = await asyncio.gather(*(summarize_with_hf(item['content']) for item in pending))
+            pending = self._fill_batch(results, pending, summaries, "huggingface")
+        
+        if pending and self.openai_client:
+            chunks = list(self._batch_chunks(pending, batch_size))
+            chunk_summaries = await asyncio.gather(*(summarize_chunk_with_openai(chunk) for chunk in chunks))
+            
+            # Keep what the batch replies returned; only articles a successful reply
+            # missed get a request of their own. A failed batch goes to extraction
+            # rather than fanning a failing endpoint out per article.
+            pending = []
+            missed = []
+            for chunk, summaries in zip(chunks, chunk_summaries):
+                if summaries is None:
+                    pending.extend(chunk)
+                else:
+                    missed.extend(self._fill_batch(results, chunk, summaries, "openai"))
+            
+            if missed:
+                summaries = await asyncio.gather(*(summarize_one_with_openai(item) for item in missed))
+                pending.extend(self._fill_batch(results, missed, summaries, "openai"))
+        
+        for item in pending:
+            summary = self.extract_key_sentences(item['content'])
+            results[item['index']] = self._remember(item['hash'], item['content'], summary, "extractive")
+        
+        return results
+    
+    def _start_batch(self, articles: List[Dict]):
+        """Resolve cached and shortcut summaries; return (results, items that still need a model)"""
+        results = [None] * len(articles)
+        pending = []
+        for index, article in enumerate(articles):
+            content = article.get('content')
+            if not content or len(content) < 100:
+                continue
+            
+            title = article.get('title', '')
+            content_hash = self._content_hash(content, title)
+            cached = self._get_cached(content_hash, content)
+            if cached:
+                results[index] = cached
+                continue
+            
+            shortcut = self._shortcut_summary(content, article.get('description', ''))
+            if shortcut:
+                results[index] = self._remember(content_hash, content, *shortcut)
+                continue
+            
+            pending.append({'index': index, 'hash': content_hash, 'content': content, 'title': title})
+        
+        return results, pending
+    
+    def _fill_batch(self, results: List, pending: List[Dict], summaries: List[Optional[str]], method: str) -> List[Dict]:
+        """Record the summaries that came back; return the items still without one"""
+        remaining = []
+        for item, summary in zip(pending, summaries):
+            if summary:
+                results[item['index']] = self._remember(item['hash'], item['content'], summary, method)
+            else:
+                remaining.append(item)
+        return remaining
+    
+    @staticmethod
+    def _batch_chunks(items: List[Dict], batch_size: int):
+        """Split items into batches bounded by count and prompt size"""
+        chunk, size = [], 0
+        for item in items:
+            item_size = len(item['title']) + min(len(item['content']), 3000)
+            if chunk and (len(chunk) >= batch_size or size + item_size > BATCH_PROMPT_MAX_CHARS):
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(item)
+            size += item_size
+        if chunk:
+            yield chunk
+    
+    def summarize_batch_with_openai(self, items: List[Dict]) -> Optional[List[Optional[str]]]:
+        """Summarize several articles in one OpenAI request.
+        
+        Returns summaries aligned with items (None where the reply missed one), or None if the request failed.
+        """
+        articles_text = "\n\n".join(
+            f"[ARTICLE {n}]\nTitle: {item['title']}\nContent: {item['content'][:3000]}"
+            for n, item in enumerate(items, 1)
+        )
+        
+        try:
+            # The client retries failed requests itself, each bounded by its timeout
+            response = self.openai_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                    {"role": "user", "content": articles_text}
+                ],
+                max_tokens=150 * len(items),
+                temperature=0.3,
+                response_format={"type": "json_object"}
+            )
+            
+            data = json.loads(response.choices[0].message.content)
+            by_id = {
+                int(entry['id']): str(entry.get('summary') or '').strip()
+                for entry in data.get('summaries', [])
+                if 'id' in entry
+            }
+        except Exception as e:
+            logging.error(f"OpenAI batch summarization error: {e}")
+            return None
+        
+        return [by_id.get(n) or None for n in range(1, len(items) + 1)]
+    
+    @staticmethod
+    def _summary_text(result) -> Optional[str]:
+        """Pull the summary text out of an HF summarization response"""
+        if isinstance(result, list) and len(result) > 0:
+            return result[0].get('summary_text', '')
+        elif isinstance(result, dict):
+            return result.get('summary_text', '')
+        return getattr(result, 'summary_text', None)
+    
     def summarize_with_openai(self, content: str, title: str = "") -> Optional[str]:
         """Summarize using OpenAI"""
         try:
@@ -125,11 +493,25 @@ class AISummarizer:
             return None
     
     def extract_key_sentences(self, content: str, num_sentences: int = 3) -> str:
-        """Simple extractive summarization as fallback"""
-        sentences = content.split('. ')
-        if len(sentences) <= num_sentences:
+        """Extractive summarization as fallback: keep the highest TF-IDF scoring sentences"""
+        # Too few sentence breaks to trim anything; stops scanning early on long articles
+        if sum(1 for _ in islice(_SENT_RE.finditer(content), num_sentences)) < num_sentences:
             return content
         
+        sentences = _SENT_RE.split(content)
+        
+        if _vectorizer is not None:
+            try:
+                with _vectorizer_lock:
+                    X = _vectorizer.fit_transform(sentences)
+                scores = np.asarray(X.sum(axis=1)).ravel()
+                # Top-k without a full sort, then restore document order
+                idx = np.sort(np.argpartition(-scores, num_sentences)[:num_sentences])
+                return ' '.join(sentences[i] for i in idx)
+            except ValueError as e:
+                # e.g. every sentence is made of stop words
+                logging.debug(f"TF-IDF scoring failed: {e}")
+        
         # Simple heuristic: take first sentence, middle sentences, and last sentence
         key_sentences = [
             sentences[0],
@@ -137,7 +519,7 @@ class AISummarizer:
             sentences[-1]
         ]
         
-        return '. '.join(key_sentences)
+        return ' '.join(key_sentences)
     
     def generate_daily_digest(self, summaries: List[Dict]) -> str:
         """Generate a daily digest from multiple article summaries"""
@@ -145,20 +527,17 @@ class AISummarizer:
             return "No articles found for today."
         
         # Group by category
-        categories = {}
+        categories = defaultdict(list)
         for item in summaries:
-            category = item.get('category', 'general')
-            if category not in categories:
-                categories[category] = []
-            categories[category].append(item)
+            categories[item.get('category', 'general')].append(item)
         
-        digest = f"Daily News Digest - {len(summaries)} articles\n\n"
+        parts = [f"Daily News Digest - {len(summaries)} articles\n\n"]
         
         for category, articles in categories.items():
-            digest += f"## {category.title()}\n\n"
+            parts.append(f"## {category.title()}\n\n")
             for article in articles:
-                digest += f"**{article['title']}**\n"
-                digest += f"{article['summary']}\n"
-                digest += f"Source: {article['source']}\n\n"
+                parts.append(f"**{article['title']}**\n")
+                parts.append(f"{article['summary']}\n")
+                parts.append(f"Source: {article['source']}\n\n")
         
-        return digest
\ No newline at end of file
+        return "".join(parts)
\ No newline at end of file
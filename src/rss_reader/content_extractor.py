@@ -1,81 +1,180 @@
+import re
+import asyncio
+import aiohttp
 import requests
-from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from bs4 import BeautifulSoup, SoupStrainer
 from newspaper import Article
 import logging
-from typing import Optional
+from typing import List, Optional
+
+try:
+    import requests_cache
+except ImportError:
+    requests_cache = None
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (compatible; RSS-AI-Summarizer/1.0)'
+}
+
+# Pages downloaded and parsed at once, and the time budget for each
+MAX_CONCURRENT_EXTRACTIONS = 8
+EXTRACTION_TIMEOUT = 45
+
+# Only build the parts of the tree that can hold article text
+_CONTENT_STRAINER = SoupStrainer(['article', 'main', 'div', 'p'])
+_CONTENT_CLASS_RE = re.compile(r'(article|post|entry)-content')
+
+def _parse_newspaper(url: str, html: bytes) -> Optional[str]:
+    """Extract content from downloaded HTML using newspaper3k"""
+    try:
+        article = Article(url)
+        article.download(input_html=html.decode('utf-8', errors='replace'))
+        article.parse()
+        
+        if article.text and len(article.text) > 100:
+            return article.text
+        return None
+        
+    except Exception as e:
+        logging.debug(f"Newspaper extraction failed for {url}: {e}")
+        return None
+
+def _parse_bs4(html: bytes) -> Optional[str]:
+    """Extract content from downloaded HTML using BeautifulSoup"""
+    soup = BeautifulSoup(html, 'lxml', parse_only=_CONTENT_STRAINER)
+    
+    # Remove unwanted elements
+    for tag in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
+        tag.decompose()
+    
+    # Try to find main content
+    candidates = (
+        soup.find(['article', 'main']),
+        soup.find(attrs={'role': 'main'}),
+        soup.find(class_=_CONTENT_CLASS_RE)
+    )
+    
+    for content_elem in candidates:
+        if content_elem:
+            text = content_elem.get_text(strip=True)
+            if len(text) > 200:
+                return text
+    
+    # Fallback: get all paragraph text
+    paragraphs = soup.find_all('p')
+    content = ' '.join([p.get_text(strip=True) for p in paragraphs])
+    
+    return content if len(content) > 200 else None
+
+def _extract_from_html(url: str, html: bytes) -> Optional[str]:
+    """Parse a downloaded page; runs in a worker process"""
+    try:
+        # Method 1: Try newspaper3k (usually most reliable)
+        content = _parse_newspaper(url, html)
+        if content and len(content) > 200:
+            return content
+        
+        # Method 2: Fallback to BeautifulSoup
+        content = _parse_bs4(html)
+        if content and len(content) > 200:
+            return content
+        
+        return None
+        
+    except Exception as e:
+        logging.error(f"Error extracting content from {url}: {e}")
+        return None
 
 class ContentExtractor:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (compatible; RSS-AI-Summarizer/1.0)'
-        })
+    def __init__(self, cache_path: str = "data/http_cache.sqlite"):
+        if requests_cache:
+            # Re-runs revalidate unchanged pages (ETag/Last-Modified) instead of
+            # downloading them again; Cache-Control headers are honoured
+            self.session = requests_cache.CachedSession(
+                cache_path,
+                backend='sqlite',
+                expire_after=3600,
+                stale_if_error=True,
+                cache_control=True
+            )
+            self.http_cache = True
+        else:
+            logging.warning("requests-cache not installed, article pages will not be cached")
+            self.session = requests.Session()
+            self.http_cache = False
+        self.session.headers.update(HEADERS)
     
     def extract_content(self, url: str) -> Optional[str]:
         """Extract full article content from URL"""
+        return asyncio.run(self.fetch_all([url]))[0]
+    
+    async def fetch_all(self, urls: List[str]) -> List[Optional[str]]:
+        """Download all URLs concurrently and extract their content, preserving order"""
+        if not urls:
+            return []
+        
+        # A single page isn't worth spinning up worker processes for
+        async with self.extractor(parallel=len(urls) > 1) as extract:
+            return await asyncio.gather(*(extract(url) for url in urls))
+    
+    @asynccontextmanager
+    async def extractor(self, parallel: bool = True):
+        """Yield a coroutine function extracting one URL, sharing one download session and parse pool"""
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_EXTRACTIONS)
+        
+        # HTML parsing is CPU bound, so spread it across processes
+        pool = ProcessPoolExecutor() if parallel else None
         try:
-            # Method 1: Try newspaper3k (usually most reliable)
-            content = self.extract_with_newspaper(url)
-            if content and len(content) > 200:
-                return content
+            if self.http_cache:
+                # The HTTP cache only hooks requests, so download through it on threads
+                download = lambda url: asyncio.to_thread(self._download_cached, url)
+                yield lambda url: self._extract_one(url, download, pool, semaphore)
+                return
             
-            # Method 2: Fallback to BeautifulSoup
-            content = self.extract_with_bs4(url)
-            if content and len(content) > 200:
-                return content
-            
-            return None
-            
-        except Exception as e:
-            logging.error(f"Error extracting content from {url}: {e}")
-            return None
+            timeout = aiohttp.ClientTimeout(total=10)
+            async with aiohttp.ClientSession(headers=HEADERS, timeout=timeout) as session:
+                download = lambda url: self._download(session, url)
+                yield lambda url: self._extract_one(url, download, pool, semaphore)
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+    
+    async def _extract_one(self, url: str, download, pool: Optional[ProcessPoolExecutor], semaphore: asyncio.Semaphore) -> Optional[str]:
+        """Download and parse one page within the concurrency and time budget"""
+        async def run() -> Optional[str]:
+            html = await download(url)
+            if not html:
+                return None
+            if pool is None:
+                return _extract_from_html(url, html)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, _extract_from_html, url, html)
+        
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(run(), EXTRACTION_TIMEOUT)
+            except asyncio.TimeoutError:
+                logging.warning(f"Timed out extracting content from {url} after {EXTRACTION_TIMEOUT}s")
+                return None
     
-    def extract_with_newspaper(self, url: str) -> Optional[str]:
-        """Extract content using newspaper3k"""
+    async def _download(self, session: aiohttp.ClientSession, url: str) -> Optional[bytes]:
+        """Fetch the raw page body for a URL"""
         try:
-            article = Article(url)
-            article.download()
-            article.parse()
-            
-            if article.text and len(article.text) > 100:
-                return article.text
-            return None
-            
+            async with session.get(url) as response:
+                response.raise_for_status()
+                return await response.read()
         except Exception as e:
-            logging.debug(f"Newspaper extraction failed for {url}: {e}")
+            logging.debug(f"Download failed for {url}: {e}")
             return None
     
-    def extract_with_bs4(self, url: str) -> Optional[str]:
-        """Extract content using BeautifulSoup as fallback"""
+    def _download_cached(self, url: str) -> Optional[bytes]:
+        """Fetch the raw page body for a URL through the cached session"""
         try:
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove unwanted elements
-            for tag in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-                tag.decompose()
-            
-            # Try to find main content
-            content_selectors = [
-                'article', '[role="main"]', '.article-content',
-                '.post-content', '.entry-content', 'main'
-            ]
-            
-            for selector in content_selectors:
-                content_elem = soup.select_one(selector)
-                if content_elem:
-                    text = content_elem.get_text(strip=True)
-                    if len(text) > 200:
-                        return text
-            
-            # Fallback: get all paragraph text
-            paragraphs = soup.find_all('p')
-            content = ' '.join([p.get_text(strip=True) for p in paragraphs])
-            
-            return content if len(content) > 200 else None
-            
+            return response.content
         except Exception as e:
-            logging.debug(f"BS4 extraction failed for {url}: {e}")
-            return None
\ No newline at end of file
+            logging.debug(f"Download failed for {url}: {e}")
+            return None
@@ -1,17 +1,42 @@
 import sqlite3
 import json
-from datetime import datetime
+import hashlib
+import threading
+from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 import logging
 
+try:
+    from pybloom_live import ScalableBloomFilter
+except ImportError:
+    ScalableBloomFilter = None
+
+# Cached summaries older than this are purged
+SUMMARY_CACHE_TTL_DAYS = 30
+
 class DatabaseManager:
     def __init__(self, db_path: str = "data/articles.db"):
         self.db_path = db_path
+        self._local = threading.local()
         self.init_database()
     
+    def _conn(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # sqlite3 keeps its own per-connection LRU of prepared
+            # statements keyed by SQL text; cached_statements sizes it
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA cache_size=-20000")
+            self._local.conn = conn
+        return conn
+    
     def init_database(self):
         """Initialize database tables"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._conn() as conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS articles (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -27,10 +52,26 @@ class DatabaseManager:
                     category TEXT,
                     feed_category TEXT,
                     summary_method TEXT,
+                    content_hash TEXT,
                     created_at DATETIME DEFAULT CURRENT_TIMESTAMP
                 )
             """)
             
+            # Databases created before content_hash existed need the column added
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(articles)")}
+            if 'content_hash' not in columns:
+                conn.execute("ALTER TABLE articles ADD COLUMN content_hash TEXT")
+            
+            # guid is UNIQUE and therefore already indexed
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_articles_published 
+                ON articles(published)
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_articles_unprocessed 
+                ON articles(published) WHERE summary IS NULL OR summary = ''
+            """)
+            
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS daily_digests (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -41,18 +82,75 @@ class DatabaseManager:
                 )
             """)
             
-            conn.commit()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS summary_cache (
+                    content_hash TEXT PRIMARY KEY,
+                    summary TEXT,
+                    method TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS feed_cache (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    last_fetch DATETIME
+                )
+            """)
+            
+            self._load_guid_filter(conn)
+    
+    def _load_guid_filter(self, conn: sqlite3.Connection):
+        """Remember every stored GUID so repeat saves can skip the write"""
+        if ScalableBloomFilter:
+            self._guid_bloom = ScalableBloomFilter(initial_capacity=10_000, error_rate=0.001)
+        else:
+            self._guid_bloom = set()
+        
+        for row in conn.execute("SELECT guid FROM articles WHERE guid IS NOT NULL"):
+            self._guid_bloom.add(row['guid'])
+    
+    @staticmethod
+    def _article_hash(article: Dict) -> str:
+        """Fingerprint of the fields a re-save could change"""
+        # The summary is included so a better summary for unchanged content still gets written
+        digest = hashlib.sha256()
+        digest.update((article.get('content') or '').encode('utf-8'))
+        digest.update(b'\0')
+        digest.update((article.get('summary') or '').encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _is_unchanged(self, conn: sqlite3.Connection, guid: str, content_hash: str) -> bool:
+        """True if the article is already stored with the same fingerprint"""
+        if not guid or guid not in self._guid_bloom:
+            return False
+        
+        # Bloom filters can report false positives, so confirm against the table
+        row = conn.execute(
+            "SELECT content_hash FROM articles WHERE guid = ?", (guid,)
+        ).fetchone()
+        return row is not None and row['content_hash'] == content_hash
     
     def save_article(self, article: Dict) -> bool:
         """Save article to database"""
+        return self.save_articles_bulk([article]) == 1
+    
+    def save_articles_bulk(self, articles: List[Dict]) -> int:
+        """Save many articles in a single transaction, returning the number saved"""
+        if not articles:
+            return 0
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    INSERT OR REPLACE INTO articles 
-                    (guid, title, link, description, content, summary, published, 
-                     processed, source, category, feed_category, summary_method)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
+            processed = datetime.now()
+            conn = self._conn()
+            rows = []
+            for article in articles:
+                content_hash = self._article_hash(article)
+                if self._is_unchanged(conn, article.get('guid'), content_hash):
+                    continue
+                rows.append((
                     article.get('guid'),
                     article.get('title'),
                     article.get('link'),
@@ -60,48 +158,125 @@ class DatabaseManager:
                     article.get('content'),
                     article.get('summary'),
                     article.get('published'),
-                    datetime.now(),
+                    processed,
                     article.get('source'),
                     article.get('category'),
                     article.get('feed_category'),
-                    article.get('summary_method')
+                    article.get('summary_method'),
+                    content_hash
                 ))
-                conn.commit()
-                return True
+            
+            if rows:
+                with conn:
+                    conn.executemany("""
+                        INSERT OR REPLACE INTO articles 
+                        (guid, title, link, description, content, summary, published, 
+                         processed, source, category, feed_category, summary_method, content_hash)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, rows)
+                
+                for row in rows:
+                    if row[0]:
+                        self._guid_bloom.add(row[0])
+            
+            skipped = len(articles) - len(rows)
+            if skipped:
+                logging.info(f"Skipped {skipped} unchanged articles")
+            
+            return len(articles)
         except Exception as e:
-            logging.error(f"Error saving article: {e}")
-            return False
+            logging.error(f"Error saving articles: {e}")
+            return 0
     
     def get_articles_by_date(self, date: str) -> List[Dict]:
         """Get articles for a specific date"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute("""
-                SELECT * FROM articles 
-                WHERE DATE(published) = ? 
-                ORDER BY published DESC
-            """, (date,))
-            
-            return [dict(row) for row in cursor.fetchall()]
+        # Compare against a [date, next day) range rather than DATE(published)
+        # so the lookup can use idx_articles_published
+        next_date = (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        
+        cursor = self._conn().execute("""
+            SELECT * FROM articles 
+            WHERE published >= ? AND published < ? 
+            ORDER BY published DESC
+        """, (date, next_date))
+        
+        return [dict(row) for row in cursor.fetchall()]
     
     def save_daily_digest(self, date: str, digest: str, article_count: int):
         """Save daily digest"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._conn() as conn:
             conn.execute("""
                 INSERT OR REPLACE INTO daily_digests 
                 (date, digest_content, article_count)
                 VALUES (?, ?, ?)
             """, (date, digest, article_count))
-            conn.commit()
     
     def get_unprocessed_articles(self) -> List[Dict]:
         """Get articles without summaries"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute("""
-                SELECT * FROM articles 
-                WHERE summary IS NULL OR summary = ''
-                ORDER BY published DESC
-            """)
-            
-            return [dict(row) for row in cursor.fetchall()]
\ No newline at end of file
+        cursor = self._conn().execute("""
+            SELECT * FROM articles 
+            WHERE summary IS NULL OR summary = ''
+            ORDER BY published DESC
+        """)
+        
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def get_cached_summary(self, content_hash: str) -> Optional[Dict]:
+        """Look up a previously generated summary by content hash"""
+        row = self._conn().execute("""
+            SELECT summary, method FROM summary_cache 
+            WHERE content_hash = ?
+        """, (content_hash,)).fetchone()
+        
+        if row:
+            return {'summary': row['summary'], 'method': row['method']}
+        return None
+    
+    def save_cached_summary(self, content_hash: str, summary: str, method: str):
+        """Remember a generated summary for its content hash"""
+        try:
+            with self._conn() as conn:
+                conn.execute("""
+                    INSERT OR REPLACE INTO summary_cache 
+                    (content_hash, summary, method, created_at)
+                    VALUES (?, ?, ?, ?)
+                """, (content_hash, summary, method, datetime.now()))
+        except Exception as e:
+            logging.error(f"Error caching summary: {e}")
+    
+    def purge_expired_summaries(self, days: int = SUMMARY_CACHE_TTL_DAYS) -> int:
+        """Delete cached summaries older than the given number of days"""
+        try:
+            cutoff = datetime.now() - timedelta(days=days)
+            with self._conn() as conn:
+                cursor = conn.execute("""
+                    DELETE FROM summary_cache 
+                    WHERE created_at < ?
+                """, (cutoff,))
+            if cursor.rowcount:
+                logging.info(f"Purged {cursor.rowcount} expired cached summaries")
+            return cursor.rowcount
+        except Exception as e:
+            logging.error(f"Error purging cached summaries: {e}")
+            return 0
+    
+    def get_feed_cache(self, url: str) -> Optional[Dict]:
+        """Get the HTTP validators stored for a feed"""
+        row = self._conn().execute("""
+            SELECT etag, last_modified, last_fetch FROM feed_cache 
+            WHERE url = ?
+        """, (url,)).fetchone()
+        
+        return dict(row) if row else None
+    
+    def save_feed_cache(self, url: str, etag: Optional[str], last_modified: Optional[str]):
+        """Remember the HTTP validators returned with a feed"""
+        try:
+            with self._conn() as conn:
+                conn.execute("""
+                    INSERT OR REPLACE INTO feed_cache 
+                    (url, etag, last_modified, last_fetch)
+                    VALUES (?, ?, ?, ?)
+                """, (url, etag, last_modified, datetime.now()))
+        except Exception as e:
+            logging.error(f"Error saving feed cache: {e}")
\ No newline at end of file
@@ -0,0 +1,28 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Fall back to the stdlib json module
+
+def dumps(obj, indent: bool = False) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes, non-ASCII characters kept as is"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+def loads(data):
+    """Deserialize JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dump_file(obj, path, indent: bool = True):
+    """Write obj to path as JSON"""
+    with open(path, 'wb') as f:
+        f.write(dumps(obj, indent))
+
+def load_file(path):
+    """Read JSON from path"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
+import io
 import os
 import sys
+import asyncio
 import logging
 from datetime import datetime, date
 from pathlib import Path
@@ -18,13 +20,19 @@ except ImportError as e:
     print("Please run: pip install -r requirements.txt")
     sys.exit(1)
 
+try:
+    from apscheduler.schedulers.asyncio import AsyncIOScheduler
+except ImportError:
+    AsyncIOScheduler = None  # Fall back to the blocking `schedule` loop
+
 # Now import our modules
 try:
-    from src.rss_reader.rss_reader import RSSReader
-    from src.rss_reader.content_extractor import ContentExtractor
-    from src.rss_reader.ai_summarizer import AISummarizer
+    from src.rss_reader.rss_reader import RSSReader, MAX_CONCURRENT_FEEDS
+    from src.rss_reader.content_extractor import ContentExtractor, MAX_CONCURRENT_EXTRACTIONS
+    from src.rss_reader.ai_summarizer import AISummarizer, MAX_CONCURRENT_SUMMARIES, SUMMARY_BATCH_SIZE
     from src.rss_reader.database import DatabaseManager
     from src.rss_reader.opml_parser import OPMLParser
+    from src.rss_reader import json_io
 except ImportError as e:
     print(f"Import error: {e}")
     print("Make sure all files exist and __init__.py files are present")
@@ -44,6 +52,36 @@ logging.basicConfig(
     ]
 )
 
+# Upper bound on a single scheduler sleep, so clock changes are noticed
+MAX_SCHEDULER_SLEEP = 300
+
+# Items buffered between pipeline stages before producers wait, and rows per DB transaction
+PIPELINE_QUEUE_SIZE = 64
+DB_WRITE_BATCH_SIZE = 50
+
+_DEFAULT_OPML_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<opml version="1.0">
+    <head>
+        <title>RSS Feeds</title>
+        <dateCreated>Sun, 26 Jun 2025 00:00:00 GMT</dateCreated>
+    </head>
+    <body>
+        <outline text="News" title="News">
+            <outline type="rss" text="BBC News" title="BBC News" xmlUrl="https://feeds.bbci.co.uk/news/rss.xml" htmlUrl="https://www.bbc.com/news"/>
+            <outline type="rss" text="CNN" title="CNN" xmlUrl="https://rss.cnn.com/rss/edition.rss" htmlUrl="https://www.cnn.com"/>
+            <outline type="rss" text="Reuters" title="Reuters" xmlUrl="https://feeds.reuters.com/reuters/topNews" htmlUrl="https://www.reuters.com"/>
+        </outline>
+        <outline text="Technology" title="Technology">
+            <outline type="rss" text="TechCrunch" title="TechCrunch" xmlUrl="https://techcrunch.com/feed/" htmlUrl="https://techcrunch.com"/>
+            <outline type="rss" text="The Verge" title="The Verge" xmlUrl="https://www.theverge.com/rss/index.xml" htmlUrl="https://www.theverge.com"/>
+            <outline type="rss" text="Ars Technica" title="Ars Technica" xmlUrl="https://feeds.arstechnica.com/arstechnica/index" htmlUrl="https://arstechnica.com"/>
+        </outline>
+        <outline text="Science" title="Science">
+            <outline type="rss" text="Science Daily" title="Science Daily" xmlUrl="https://www.sciencedaily.com/rss/all.xml" htmlUrl="https://www.sciencedaily.com"/>
+        </outline>
+    </body>
+</opml>'''
+
 class RSSAISummarizer:
     def __init__(self, config_file: str = None):
         # Use absolute paths
@@ -75,42 +113,19 @@ class RSSAISummarizer:
                 self.create_default_json_config(config_path)
         
         self.config_path = config_path
-        self.rss_reader = RSSReader(str(config_path))
-        self.content_extractor = ContentExtractor()
-        self.ai_summarizer = AISummarizer()
         self.db = DatabaseManager(str(db_path))
+        self.rss_reader = RSSReader(str(config_path), self.db)
+        self.content_extractor = ContentExtractor(str(db_path.parent / 'http_cache.sqlite'))
+        self.ai_summarizer = AISummarizer(self.db)
         
-        # Print feed statistics
-        stats = self.rss_reader.get_feed_statistics()
-        logging.info(f"Loaded {stats['total_feeds']} feeds across {stats['category_count']} categories")
+        # The feed list is fixed once loaded, so compute statistics once
+        self._feed_stats = self.rss_reader.get_feed_statistics()
+        logging.info(f"Loaded {self._feed_stats['total_feeds']} feeds across {self._feed_stats['category_count']} categories")
     
     def create_default_opml(self, opml_path: Path):
         """Create a default OPML file with sample feeds"""
-        opml_content = '''<?xml version="1.0" encoding="UTF-8"?>
-<opml version="1.0">
-    <head>
-        <title>RSS Feeds</title>
-        <dateCreated>Sun, 26 Jun 2025 00:00:00 GMT</dateCreated>
-    </head>
-    <body>
-        <outline text="News" title="News">
-            <outline type="rss" text="BBC News" title="BBC News" xmlUrl="https://feeds.bbci.co.uk/news/rss.xml" htmlUrl="https://www.bbc.com/news"/>
-            <outline type="rss" text="CNN" title="CNN" xmlUrl="https://rss.cnn.com/rss/edition.rss" htmlUrl="https://www.cnn.com"/>
-            <outline type="rss" text="Reuters" title="Reuters" xmlUrl="https://feeds.reuters.com/reuters/topNews" htmlUrl="https://www.reuters.com"/>
-        </outline>
-        <outline text="Technology" title="Technology">
-            <outline type="rss" text="TechCrunch" title="TechCrunch" xmlUrl="https://techcrunch.com/feed/" htmlUrl="https://techcrunch.com"/>
-            <outline type="rss" text="The Verge" title="The Verge" xmlUrl="https://www.theverge.com/rss/index.xml" htmlUrl="https://www.theverge.com"/>
-            <outline type="rss" text="Ars Technica" title="Ars Technica" xmlUrl="https://feeds.arstechnica.com/arstechnica/index" htmlUrl="https://arstechnica.com"/>
-        </outline>
-        <outline text="Science" title="Science">
-            <outline type="rss" text="Science Daily" title="Science Daily" xmlUrl="https://www.sciencedaily.com/rss/all.xml" htmlUrl="https://www.sciencedaily.com"/>
-        </outline>
-    </body>
-</opml>'''
-        
         with open(opml_path, 'w', encoding='utf-8') as f:
-            f.write(opml_content)
+            f.write(_DEFAULT_OPML_XML)
         
         logging.info(f"Created default OPML config at: {opml_path}")
     
@@ -136,9 +151,7 @@ class RSSAISummarizer:
             ]
         }
         
-        import json
-        with open(config_path, 'w') as f:
-            json.dump(default_config, f, indent=2)
+        json_io.dump_file(default_config, config_path)
         
         logging.info(f"Created default JSON config at: {config_path}")
     
@@ -151,59 +164,130 @@ class RSSAISummarizer:
     
     def process_daily_articles(self):
         """Main processing function"""
+        asyncio.run(self.process_daily_articles_async())
+    
+    async def process_daily_articles_async(self):
+        """Main processing pipeline, run on the event loop.
+        
+        Stages are connected by bounded queues (fetch -> extract -> summarize -> store),
+        so extraction starts as soon as the first feed returns.
+        """
         logging.info("Starting daily article processing...")
         
+        # Fix the digest date up front so a run straddling midnight stays on one day
+        today = date.today().isoformat()
+        
         try:
-            # Step 1: Fetch new articles
-            articles = self.rss_reader.fetch_all_feeds(hours_back=24, max_articles_per_feed=15)
-            logging.info(f"Fetched {len(articles)} articles")
-            
-            if not articles:
-                logging.warning("No articles found. Check your RSS feeds configuration.")
-                return
+            self.db.purge_expired_summaries()
             
+            extract_q = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+            summary_q = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+            store_q = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+            pending_writes = []
             processed_count = 0
             
-            for i, article in enumerate(articles, 1):
+            # Shared by all summary workers so the upstream request limit holds across batches
+            summary_semaphore = asyncio.Semaphore(MAX_CONCURRENT_SUMMARIES)
+            
+            def flush():
+                nonlocal processed_count
                 try:
-                    logging.info(f"Processing article {i}/{len(articles)}: {article.get('title', 'Unknown')[:100]}...")
-                    
-                    # Step 2: Extract full content
-                    if not article.get('content'):
-                        content = self.content_extractor.extract_content(article['link'])
-                        article['content'] = content
-                    
-                    # Step 3: Generate summary
-                    if article.get('content'):
-                        summary_result = self.ai_summarizer.summarize_article(
-                            article['content'], 
-                            article['title']
-                        )
-                        
-                        if summary_result:
-                            article['summary'] = summary_result['summary']
-                            article['summary_method'] = summary_result['method']
-                            logging.info(f"Generated summary using {summary_result['method']}")
-                    
-                    # Step 4: Save to database
-                    if self.db.save_article(article):
-                        processed_count += 1
+                    saved = self.db.save_articles_bulk(pending_writes)
+                    processed_count += saved
+                    if saved:
+                        # Only now is it safe to let these feeds answer 304 next time
+                        self.rss_reader.mark_stored(pending_writes)
+                finally:
+                    pending_writes.clear()
+            
+            async def extract_worker(extract):
+                while True:
+                    article = await extract_q.get()
+                    try:
+                        # Only fetch the page when the feed didn't carry the full article;
+                        # a partial feed body is still better than nothing if extraction fails
+                        if not article.get('content_is_full'):
+                            article['content'] = await extract(article['link']) or article.get('content')
+                    except Exception as e:
+                        logging.error(f"Error extracting {article.get('link')}: {e}")
                     
-                except Exception as e:
-                    logging.error(f"Error processing article {article.get('title', 'Unknown')}: {e}")
+                    try:
+                        # Pass it on even when extraction failed, so it is still stored
+                        await summary_q.put(article)
+                    finally:
+                        extract_q.task_done()
+            
+            async def summary_worker():
+                while True:
+                    # Take whatever is ready, up to one batch, so OpenAI gets several articles per request
+                    batch = [await summary_q.get()]
+                    while len(batch) < SUMMARY_BATCH_SIZE and not summary_q.empty():
+                        batch.append(summary_q.get_nowait())
+                    try:
+                        summary_results = await self.ai_summarizer.summarize_articles_batch_async(batch, semaphore=summary_semaphore)
+                        for article, summary_result in zip(batch, summary_results):
+                            if summary_result:
+                                article['summary'] = summary_result['summary']
+                                article['summary_method'] = summary_result['method']
+                                logging.info(f"Generated summary for {article.get('title', 'Unknown')[:100]} using {summary_result['method']}")
+                    except Exception as e:
+                        logging.error(f"Error summarizing batch of {len(batch)} articles: {e}")
+                    finally:
+                        for article in batch:
+                            await store_q.put(article)
+                            summary_q.task_done()
+            
+            async def store_worker():
+                # A single writer batches rows into a few transactions
+                while True:
+                    article = await store_q.get()
+                    try:
+                        pending_writes.append(article)
+                        if len(pending_writes) >= DB_WRITE_BATCH_SIZE:
+                            flush()
+                    except Exception as e:
+                        logging.error(f"Error saving articles: {e}")
+                    finally:
+                        store_q.task_done()
+            
+            async with self.content_extractor.extractor() as extract:
+                workers = [asyncio.create_task(extract_worker(extract)) for _ in range(MAX_CONCURRENT_EXTRACTIONS)]
+                workers += [asyncio.create_task(summary_worker()) for _ in range(MAX_CONCURRENT_SUMMARIES)]
+                workers.append(asyncio.create_task(store_worker()))
+                try:
+                    fetched = await self.rss_reader.fetch_into_queue(
+                        extract_q, hours_back=24, max_articles_per_feed=15, workers=MAX_CONCURRENT_FEEDS
+                    )
+                    # Drain each stage in order; a stage is done once the one before it is
+                    for queue in (extract_q, summary_q, store_q):
+                        await queue.join()
+                finally:
+                    for worker in workers:
+                        worker.cancel()
+                    await asyncio.gather(*workers, return_exceptions=True)
             
-            logging.info(f"Successfully processed {processed_count}/{len(articles)} articles")
+            if pending_writes:
+                flush()
             
-            # Step 5: Generate daily digest
-            self.generate_daily_digest()
+            if not fetched:
+                logging.warning("No new articles found. Feeds may be unchanged since the last run, otherwise check your RSS feeds configuration.")
+                return
+            
+            logging.info(f"Successfully processed {processed_count}/{fetched} articles")
+            
+            # Generate daily digest. Unchanged feeds are skipped on
+            # fetch, so read the day's articles back from the database
+            self.generate_daily_digest(today)
             
         except Exception as e:
             logging.error(f"Error in daily processing: {e}")
     
-    def generate_daily_digest(self):
+    def generate_daily_digest(self, today: str = None):
         """Generate and save daily digest"""
         try:
-            today = date.today().isoformat()
+            if not today:
+                today = date.today().isoformat()
+            
             articles = self.db.get_articles_by_date(today)
             
             if not articles:
@@ -249,19 +333,26 @@ class RSSAISummarizer:
     
     def show_feed_stats(self):
         """Display feed statistics"""
-        stats = self.rss_reader.get_feed_statistics()
+        if not logging.getLogger().isEnabledFor(logging.INFO):
+            return
+        
+        stats = self._feed_stats
         
-        print(f"\n📊 Feed Statistics:")
-        print(f"Total feeds: {stats['total_feeds']}")
-        print(f"Categories: {stats['category_count']}")
-        print("\nFeeds by category:")
+        # Build the whole report first so it goes out in a single write
+        buf = io.StringIO()
+        buf.write("\nFeed Statistics:\n")
+        buf.write(f"Total feeds: {stats['total_feeds']}\n")
+        buf.write(f"Categories: {stats['category_count']}\n")
+        buf.write("\nFeeds by category:\n")
         
         for category, info in stats['categories'].items():
-            print(f"  {category}: {info['count']} feeds")
+            buf.write(f"  {category}: {info['count']} feeds\n")
             for feed_title in info['feeds'][:3]:  # Show first 3
-                print(f"    - {feed_title}")
+                buf.write(f"    - {feed_title}\n")
             if len(info['feeds']) > 3:
-                print(f"    ... and {len(info['feeds']) - 3} more")
+                buf.write(f"    ... and {len(info['feeds']) - 3} more\n")
+        
+        sys.stdout.write(buf.getvalue())
     
     def run_once(self):
         """Run processing once"""
@@ -270,6 +361,13 @@ class RSSAISummarizer:
     
     def run_scheduler(self):
         """Run the scheduler"""
+        if AsyncIOScheduler:
+            try:
+                asyncio.run(self.run_scheduler_async())
+            except KeyboardInterrupt:
+                logging.info("Scheduler stopped by user")
+            return
+        
         # Schedule daily processing at 8 AM
         schedule.every().day.at("08:00").do(self.process_daily_articles)
         
@@ -280,10 +378,43 @@ class RSSAISummarizer:
         
         try:
             while True:
+                # Sleep until the next job is due instead of polling every minute
+                idle = schedule.idle_seconds()
+                if idle is None:
+                    break  # No jobs left
+                if idle > 0:
+                    time.sleep(min(idle, MAX_SCHEDULER_SLEEP))
                 schedule.run_pending()
-                time.sleep(60)  # Check every minute
         except KeyboardInterrupt:
             logging.info("Scheduler stopped by user")
+    
+    async def run_scheduler_async(self):
+        """Run the scheduler on an asyncio event loop"""
+        scheduler = AsyncIOScheduler()
+        
+        # The two jobs are independent, so keep their runs from overlapping
+        lock = asyncio.Lock()
+        
+        async def process_exclusive():
+            if lock.locked():
+                logging.info("Previous processing run still in progress, skipping this one")
+                return
+            async with lock:
+                await self.process_daily_articles_async()
+        
+        # Schedule daily processing at 8 AM
+        scheduler.add_job(process_exclusive, 'cron', hour=8)
+        
+        # Schedule additional processing every 4 hours
+        scheduler.add_job(process_exclusive, 'interval', hours=4)
+        
+        scheduler.start()
+        logging.info("Scheduler started. Press Ctrl+C to stop.")
+        
+        try:
+            await asyncio.Event().wait()
+        finally:
+            scheduler.shutdown(wait=False)
 
 def main():
     import argparse
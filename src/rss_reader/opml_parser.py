@@ -1,8 +1,63 @@
+import re
 import opml
 import xml.etree.ElementTree as ET
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import os
 import logging
+from functools import lru_cache
 from pathlib import Path
+from . import json_io
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None  # Fall back to the stdlib parser
+
+_CLEAN_NON_WORD = re.compile(r'[^\w\s-]')
+_COLLAPSE_WS = re.compile(r'\s+')
+
+@lru_cache(maxsize=1024)
+def _clean_category_name(category: str) -> str:
+    """Normalize a category name; names repeat heavily, so results are cached"""
+    # Remove special characters and convert to lowercase
+    cleaned = _COLLAPSE_WS.sub('_', _CLEAN_NON_WORD.sub('', category.lower()).strip())
+    return cleaned or 'general'
+
+@lru_cache(maxsize=4)
+def _parse_opml_cached(path_str: str, mtime: float) -> Tuple[Tuple[Dict, Optional[str]], ...]:
+    """Stream an OPML file once per modification time.
+    
+    Returns (feed outline attributes, enclosing category name) pairs.
+    """
+    if etree is not None:
+        context = etree.iterparse(path_str, events=('start', 'end'), tag='outline')
+    else:
+        context = ET.iterparse(path_str, events=('start', 'end'))
+    
+    outlines = []
+    categories = []  # Names of the category outlines we are currently inside
+    
+    for event, outline in context:
+        if outline.tag != 'outline':
+            continue
+        
+        if not outline.get('xmlUrl'):  # This is a category
+            if event == 'start':
+                categories.append(outline.get('text') or outline.get('title'))
+            else:
+                categories.pop()
+            continue
+        
+        if event == 'end':
+            outlines.append((dict(outline.attrib), categories[-1] if categories else None))
+            
+            # Free feeds as we go so memory stays flat on large files
+            outline.clear()
+            if etree is not None:
+                while outline.getprevious() is not None:
+                    del outline.getparent()[0]
+    
+    return tuple(outlines)
 
 class OPMLParser:
     def __init__(self, opml_file_path: str):
@@ -47,13 +102,13 @@ class OPMLParser:
     def parse_with_xml(self) -> List[Dict]:
         """Parse OPML manually using XML parser"""
         try:
-            tree = ET.parse(self.opml_file_path)
-            root = tree.getroot()
+            # mtime is part of the cache key, so an edited file is parsed again
+            path_str = str(self.opml_file_path)
+            outlines = _parse_opml_cached(path_str, os.path.getmtime(path_str))
             
             feeds = []
             
-            # Find all outline elements that have xmlUrl (RSS feeds)
-            for outline in root.iter('outline'):
+            for outline, parent in outlines:
                 xml_url = outline.get('xmlUrl')
                 html_url = outline.get('htmlUrl')
                 title = outline.get('title') or outline.get('text')
@@ -61,19 +116,17 @@ class OPMLParser:
                 
                 # Get category from parent outline if not present
                 if not category:
-                    parent = self._find_parent_category(root, outline)
                     category = parent if parent else 'general'
                 
-                if xml_url:  # This is a feed
-                    feed_info = {
-                        'url': xml_url,
-                        'title': title or 'Unknown Feed',
-                        'html_url': html_url,
-                        'category': self._clean_category_name(category),
-                        'description': outline.get('description', ''),
-                        'language': outline.get('language', 'en')
-                    }
-                    feeds.append(feed_info)
+                feed_info = {
+                    'url': xml_url,
+                    'title': title or 'Unknown Feed',
+                    'html_url': html_url,
+                    'category': self._clean_category_name(category),
+                    'description': outline.get('description', ''),
+                    'language': outline.get('language', 'en')
+                }
+                feeds.append(feed_info)
             
             logging.info(f"Parsed {len(feeds)} feeds from OPML using XML parser")
             return feeds
@@ -106,30 +159,16 @@ class OPMLParser:
                     for sub_item in outline:
                         self._extract_feeds_from_outline(sub_item, feeds, new_category)
     
-    def _find_parent_category(self, root, target_outline):
-        """Find the parent category of an outline element"""
-        for outline in root.iter('outline'):
-            if not outline.get('xmlUrl'):  # This is a category
-                for child in outline:
-                    if child == target_outline:
-                        return outline.get('text') or outline.get('title')
-        return 'general'
-    
     def _clean_category_name(self, category: str) -> str:
         """Clean and normalize category names"""
         if not category:
             return 'general'
         
-        # Remove special characters and convert to lowercase
-        import re
-        cleaned = re.sub(r'[^\w\s-]', '', category.lower())
-        cleaned = re.sub(r'\s+', '_', cleaned.strip())
-        return cleaned or 'general'
+        return _clean_category_name(category)
     
     def export_to_json(self, output_file: str) -> bool:
         """Export parsed feeds to JSON format (for compatibility)"""
         try:
-            import json
             feeds = self.parse_opml()
             
             json_structure = {
@@ -144,8 +183,7 @@ class OPMLParser:
                 ]
             }
             
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(json_structure, f, indent=2, ensure_ascii=False)
+            json_io.dump_file(json_structure, output_file)
             
             logging.info(f"Exported {len(feeds)} feeds to {output_file}")
             return True
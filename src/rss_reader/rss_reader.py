@@ -1,20 +1,71 @@
+import heapq
+import asyncio
+import aiohttp
 import feedparser
 import requests
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict
-import json
+from email.utils import parsedate_to_datetime
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+import dateutil.parser
 import logging
 from .opml_parser import OPMLParser
+from . import json_io
 import pytz
+import lxml.etree
+import lxml.html
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None  # Fall back to lxml for description text
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (compatible; RSS-AI-Summarizer/1.0)'
+}
+
+# Concurrency limits for fetching feeds
+MAX_CONCURRENT_FEEDS = 16
+MAX_CONNECTIONS = 64
+MAX_CONNECTIONS_PER_HOST = 4
+
+# Feed-supplied content at least this long is taken as the full article, so the page isn't fetched
+FULL_CONTENT_MIN_LENGTH = 1500
+
+@lru_cache(maxsize=4096)
+def _parse_date_cached(date_str: str) -> Optional[datetime]:
+    """Parse a feed date into an aware UTC datetime, or None if unparseable"""
+    try:
+        # RFC 2822, the usual RSS format: 'Wed, 02 Oct 2024 12:00:00 GMT'
+        parsed_date = parsedate_to_datetime(date_str)
+    except (TypeError, ValueError, IndexError):
+        try:
+            # ISO 8601, the usual Atom format
+            parsed_date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+        except ValueError:
+            try:
+                # Slow, but handles whatever else feeds come up with
+                parsed_date = dateutil.parser.parse(date_str)
+            except (ValueError, OverflowError):
+                return None
+    
+    # If datetime is naive (no timezone), assume UTC
+    if parsed_date.tzinfo is None:
+        return parsed_date.replace(tzinfo=timezone.utc)
+    return parsed_date.astimezone(timezone.utc)
 
 class RSSReader:
-    def __init__(self, feeds_config_path: str):
+    def __init__(self, feeds_config_path: str, db=None):
         self.feeds_config_path = feeds_config_path
+        self.db = db  # Optional DatabaseManager used to remember feed validators
+        # Validators of fetched feeds, held until their articles are stored:
+        # feed url -> {'etag', 'last_modified', 'remaining'}
+        self._pending_validators = {}
         self.feeds = self.load_feeds(feeds_config_path)
         self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (compatible; RSS-AI-Summarizer/1.0)'
-        })
+        self.session.headers.update(HEADERS)
     
     def load_feeds(self, config_path: str) -> List[Dict]:
         """Load RSS feeds from OPML or JSON configuration file"""
@@ -29,8 +80,12 @@ class RSSReader:
     
     def load_from_opml(self, opml_path: str) -> List[Dict]:
         """Load feeds from OPML file"""
-        parser = OPMLParser(opml_path)
-        feeds = parser.parse_opml()
+        feeds = self._load_opml_cache(opml_path)
+        if feeds is None:
+            parser = OPMLParser(opml_path)
+            feeds = parser.parse_opml()
+            if feeds:
+                self._save_opml_cache(opml_path, feeds)
         
         logging.info(f"Loaded {len(feeds)} feeds from OPML file")
         
@@ -47,113 +102,204 @@ class RSSReader:
         
         return feeds
     
+    @staticmethod
+    def _load_opml_cache(opml_path: str) -> Optional[List[Dict]]:
+        """Feeds parsed on an earlier run, if the OPML file hasn't changed since"""
+        cache = Path(opml_path + '.parsed.json')
+        try:
+            if cache.stat().st_mtime >= Path(opml_path).stat().st_mtime:
+                return json_io.load_file(cache)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable OPML cache {cache}: {e}")
+        return None
+    
+    @staticmethod
+    def _save_opml_cache(opml_path: str, feeds: List[Dict]):
+        """Persist parsed feeds next to the OPML file for the next start"""
+        cache = Path(opml_path + '.parsed.json')
+        try:
+            cache.write_bytes(json_io.dumps(feeds))
+        except OSError as e:
+            logging.warning(f"Could not write OPML cache {cache}: {e}")
+    
     def load_from_json(self, json_path: str) -> List[Dict]:
         """Load feeds from JSON configuration file (legacy support)"""
-        with open(json_path, 'r') as f:
-            config = json.load(f)
-            return config.get('feeds', [])
-    
-    def normalize_datetime(self, dt: datetime) -> datetime:
-        """Ensure datetime is timezone-aware"""
-        if dt is None:
-            return datetime.now(timezone.utc)
-        
-        # If datetime is naive (no timezone), assume UTC
-        if dt.tzinfo is None:
-            return dt.replace(tzinfo=timezone.utc)
-        
-        # If datetime has timezone info, convert to UTC
-        return dt.astimezone(timezone.utc)
+        config = json_io.load_file(json_path)
+        return config.get('feeds', [])
     
     def parse_date(self, date_str: str) -> datetime:
         """Parse various date formats and ensure timezone awareness"""
         if not date_str:
             return datetime.now(timezone.utc)
         
-        try:
-            # Try using dateutil parser first
-            import dateutil.parser
-            parsed_date = dateutil.parser.parse(date_str)
-            return self.normalize_datetime(parsed_date)
-        except:
-            # Fallback to manual parsing
-            try:
-                # RFC 2822 format: 'Wed, 02 Oct 2024 12:00:00 GMT'
-                parsed_date = datetime.strptime(date_str, '%a, %d %b %Y %H:%M:%S %Z')
-                return self.normalize_datetime(parsed_date)
-            except:
-                try:
-                    # RFC 2822 format with timezone offset
-                    parsed_date = datetime.strptime(date_str, '%a, %d %b %Y %H:%M:%S %z')
-                    return self.normalize_datetime(parsed_date)
-                except:
-                    try:
-                        # ISO format
-                        parsed_date = datetime.strptime(date_str, '%Y-%m-%dT%H:%M:%S%z')
-                        return self.normalize_datetime(parsed_date)
-                    except:
-                        try:
-                            # ISO format without timezone
-                            parsed_date = datetime.strptime(date_str, '%Y-%m-%dT%H:%M:%S')
-                            return self.normalize_datetime(parsed_date)
-                        except:
-                            # If all parsing fails, return current time
-                            logging.warning(f"Could not parse date: {date_str}, using current time")
-                            return datetime.now(timezone.utc)
+        parsed_date = _parse_date_cached(date_str)
+        if parsed_date is None:
+            # If all parsing fails, return current time
+            logging.warning(f"Could not parse date: {date_str}, using current time")
+            return datetime.now(timezone.utc)
+        return parsed_date
     
     def fetch_feed(self, feed_info: Dict) -> List[Dict]:
         """Fetch and parse RSS feed"""
         feed_url = feed_info['url']
         try:
-            response = self.session.get(feed_url, timeout=15)
+            response = self.session.get(feed_url, timeout=15, headers=self._conditional_headers(feed_url))
+            if response.status_code == 304:
+                logging.info(f"Feed unchanged since last fetch: {feed_info.get('title', feed_url)}")
+                return []
             response.raise_for_status()
             
-            feed = feedparser.parse(response.content)
-            articles = []
-            
-            if hasattr(feed, 'bozo') and feed.bozo:
-                logging.warning(f"Feed parsing warning for {feed_url}: {feed.bozo_exception}")
+            articles = self._parse_feed(feed_info, response.content)
+            self._hold_validators(feed_url, response.headers)
+            return articles
             
-            for entry in feed.entries:
-                # Parse the publication date
-                published_date = self.parse_date(entry.get('published', ''))
-                
-                article = {
-                    'title': entry.get('title', ''),
-                    'link': entry.get('link', ''),
-                    'description': self._clean_description(entry.get('description', '')),
-                    'published': published_date,
-                    'source': feed_info.get('title', feed.feed.get('title', 'Unknown')),
-                    'category': entry.get('category', ''),
-                    'guid': entry.get('id', entry.get('link', '')),
-                    'feed_category': feed_info.get('category', 'general'),
-                    'feed_title': feed_info.get('title', ''),
-                    'author': entry.get('author', ''),
-                    'tags': self._extract_tags(entry)
-                }
-                articles.append(article)
+        except Exception as e:
+            logging.error(f"Error fetching feed {feed_url}: {e}")
+            return []
+    
+    async def _fetch_one(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, feed_info: Dict) -> List[Dict]:
+        """Fetch and parse a single feed without blocking the event loop"""
+        feed_url = feed_info['url']
+        try:
+            async with semaphore:
+                logging.info(f"Fetching feed: {feed_info.get('title', feed_url)}")
+                async with session.get(feed_url, timeout=aiohttp.ClientTimeout(total=15),
+                                       headers=self._conditional_headers(feed_url)) as response:
+                    if response.status == 304:
+                        logging.info(f"Feed unchanged since last fetch: {feed_info.get('title', feed_url)}")
+                        return []
+                    response.raise_for_status()
+                    body = await response.read()
+                    response_headers = response.headers
             
+            # feedparser is CPU bound, keep it off the event loop
+            loop = asyncio.get_running_loop()
+            articles = await loop.run_in_executor(None, self._parse_feed, feed_info, body)
+            self._hold_validators(feed_url, response_headers)
             return articles
             
         except Exception as e:
             logging.error(f"Error fetching feed {feed_url}: {e}")
             return []
     
+    def _conditional_headers(self, feed_url: str) -> Dict:
+        """If-None-Match / If-Modified-Since headers from the last successful fetch"""
+        if not self.db:
+            return {}
+        
+        cached = self.db.get_feed_cache(feed_url)
+        if not cached:
+            return {}
+        
+        headers = {}
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        return headers
+    
+    def _hold_validators(self, feed_url: str, response_headers):
+        """Keep the ETag / Last-Modified of a freshly parsed feed until its articles are stored.
+        
+        Saving them earlier would make the next run get a 304 and never see
+        articles that were lost before reaching the database.
+        """
+        self._pending_validators[feed_url] = {
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'remaining': 0
+        }
+    
+    def commit_validators(self, feed_url: str):
+        """Store the held validators of a feed, so its next fetch can be conditional"""
+        pending = self._pending_validators.pop(feed_url, None)
+        if pending and self.db:
+            self.db.save_feed_cache(feed_url, pending['etag'], pending['last_modified'])
+    
+    def mark_stored(self, articles: List[Dict]):
+        """Count queued articles as saved; a feed's validators are stored once all of its articles are"""
+        for article in articles:
+            feed_url = article.get('feed_url')
+            pending = self._pending_validators.get(feed_url)
+            if pending:
+                pending['remaining'] -= 1
+                if pending['remaining'] <= 0:
+                    self.commit_validators(feed_url)
+    
+    def _parse_feed(self, feed_info: Dict, body: bytes) -> List[Dict]:
+        """Parse a downloaded feed body into article dicts"""
+        feed_url = feed_info['url']
+        feed = feedparser.parse(body)
+        articles = []
+        
+        if hasattr(feed, 'bozo') and feed.bozo:
+            logging.warning(f"Feed parsing warning for {feed_url}: {feed.bozo_exception}")
+        
+        for entry in feed.entries:
+            # Parse the publication date
+            published_date = self.parse_date(entry.get('published', ''))
+            content, has_body = self._entry_content(entry)
+            
+            article = {
+                'title': entry.get('title', ''),
+                'link': entry.get('link', ''),
+                'description': self._clean_description(entry.get('description', '')),
+                'published': published_date,
+                'source': feed_info.get('title', feed.feed.get('title', 'Unknown')),
+                'category': entry.get('category', ''),
+                'guid': entry.get('id', entry.get('link', '')),
+                'feed_category': feed_info.get('category', 'general'),
+                'feed_title': feed_info.get('title', ''),
+                'author': entry.get('author', ''),
+                'tags': self._extract_tags(entry),
+                'content': content,
+                'content_is_full': has_body and len(content) > FULL_CONTENT_MIN_LENGTH
+            }
+            articles.append(article)
+        
+        return articles
+    
+    def _entry_content(self, entry) -> Tuple[str, bool]:
+        """Article text shipped in the feed itself, and whether it came from a body element.
+        
+        Without Atom content or content:encoded this is the summary, i.e. the description.
+        """
+        if getattr(entry, 'content', None):
+            return self._clean_description(entry.content[0].get('value', '')), True
+        if entry.get('content:encoded'):
+            return self._clean_description(entry['content:encoded']), True
+        return self._clean_description(entry.get('summary_detail', {}).get('value', '')), False
+    
     def _clean_description(self, description: str) -> str:
         """Clean HTML from description"""
         if not description:
             return ''
         
-        from bs4 import BeautifulSoup
-        soup = BeautifulSoup(description, 'html.parser')
-        return soup.get_text(strip=True)
+        # Short plain-text descriptions have nothing to strip
+        if len(description) < 200 and '<' not in description and '&' not in description:
+            return description.strip()
+        
+        if HTMLParser:
+            return HTMLParser(description).text(separator=' ').strip()
+        
+        try:
+            return lxml.html.fromstring(description).text_content().strip()
+        except (lxml.etree.ParserError, ValueError):
+            return description.strip()
     
     def _extract_tags(self, entry) -> List[str]:
         """Extract tags from feed entry"""
+        has_tags = hasattr(entry, 'tags')
+        has_category = hasattr(entry, 'category')
+        if not (has_tags or has_category):
+            return []
+        
         tags = []
         
         # Try to get tags from various fields
-        if hasattr(entry, 'tags'):
+        if has_tags:
             for tag in entry.tags:
                 if hasattr(tag, 'term'):
                     tags.append(tag.term)
@@ -161,86 +307,161 @@ class RSSReader:
                     tags.append(tag)
         
         # Also check categories
-        if hasattr(entry, 'category'):
+        if has_category:
             tags.append(entry.category)
         
-        return list(set(tags))  # Remove duplicates
+        if not tags:
+            return []
+        
+        return list(dict.fromkeys(tags))  # Remove duplicates, keeping feed order
     
     def fetch_all_feeds(self, hours_back: int = 24, max_articles_per_feed: int = 10) -> List[Dict]:
         """Fetch articles from all configured feeds"""
-        all_articles = []
+        return asyncio.run(self.fetch_all_feeds_async(hours_back, max_articles_per_feed))
+    
+    async def fetch_all_feeds_async(self, hours_back: int = 24, max_articles_per_feed: int = 10) -> List[Dict]:
+        """Fetch articles from all configured feeds concurrently, newest first.
         
-        # Create timezone-aware cutoff date
-        cutoff_date = datetime.now(timezone.utc) - timedelta(hours=hours_back)
+        Feed validators are held back; call commit_validators() for a feed once its articles are stored.
+        """
+        per_feed_sorted = []
         
-        total_feeds = len(self.feeds)
-        processed_feeds = 0
+        async def collect(feed_info: Dict, feed_articles: List[Dict]):
+            per_feed_sorted.append(feed_articles)
         
-        for feed_info in self.feeds:
+        await self._fetch_feeds(collect, hours_back, max_articles_per_feed)
+        
+        # Each feed's list is already newest first, so merge them rather than re-sorting everything
+        try:
+            return list(heapq.merge(*per_feed_sorted, key=lambda x: x['published'], reverse=True))
+        except Exception as e:
+            logging.warning(f"Could not sort articles by date: {e}")
+            return [article for articles in per_feed_sorted for article in articles]
+    
+    async def fetch_into_queue(self, out_q: asyncio.Queue, hours_back: int = 24, max_articles_per_feed: int = 10,
+                               workers: int = MAX_CONCURRENT_FEEDS) -> int:
+        """Fetch all feeds, streaming each feed's recent articles into out_q as it completes.
+        
+        Each article is tagged with its feed_url; pass stored articles to mark_stored()
+        so the feed's validators are saved only once its articles are in the database.
+        Returns the number of articles queued.
+        """
+        # Validators left over from an interrupted run are simply fetched again
+        self._pending_validators.clear()
+        
+        async def enqueue(feed_info: Dict, feed_articles: List[Dict]):
             feed_url = feed_info['url']
-            category = feed_info.get('category', 'general')
-            
-            logging.info(f"Fetching feed ({processed_feeds + 1}/{total_feeds}): {feed_info.get('title', feed_url)}")
+            if not feed_articles:
+                # Nothing to store, so nothing can be lost
+                self.commit_validators(feed_url)
+                return
             
+            pending = self._pending_validators.get(feed_url)
+            if pending:
+                pending['remaining'] = len(feed_articles)
+            for article in feed_articles:
+                article['feed_url'] = feed_url
+                await out_q.put(article)
+        
+        return await self._fetch_feeds(enqueue, hours_back, max_articles_per_feed, workers)
+    
+    @asynccontextmanager
+    async def feed_fetcher(self):
+        """Yield a coroutine function fetching one feed, sharing one connection pool"""
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_FEEDS)
+        connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS, limit_per_host=MAX_CONNECTIONS_PER_HOST)
+        async with aiohttp.ClientSession(headers=HEADERS, connector=connector) as session:
+            yield lambda feed_info: self._fetch_one(session, semaphore, feed_info)
+    
+    async def _fetch_feeds(self, on_feed, hours_back: int, max_articles_per_feed: int,
+                           workers: int = MAX_CONCURRENT_FEEDS) -> int:
+        """Fetch all feeds with a pool of workers, awaiting on_feed(feed_info, articles) with each feed's
+        recent, not yet seen articles as soon as that feed completes. Returns the article count.
+        """
+        cutoff_date = datetime.now(timezone.utc) - timedelta(hours=hours_back)
+        
+        fetch_q = asyncio.Queue()
+        for feed_info in self.feeds:
+            fetch_q.put_nowait(feed_info)
+        
+        # Links/guids already delivered; the first feed to deliver a story keeps it,
+        # and a repeat in a later feed doesn't use up that feed's slots
+        seen = set()
+        total = 0
+        
+        async def worker(fetch):
+            nonlocal total
+            while True:
+                feed_info = await fetch_q.get()
+                try:
+                    articles = await fetch(feed_info)
+                    
+                    # No await between the check and the claim, so workers can't race
+                    articles = self._remove_duplicates(articles, seen)
+                    recent_articles = self._filter_recent(feed_info, articles, cutoff_date, max_articles_per_feed)
+                    seen.update(article.get('guid') or article.get('link') for article in recent_articles)
+                    logging.info(f"Found {len(recent_articles)} recent articles from {feed_info.get('title', feed_info['url'])}")
+                    
+                    total += len(recent_articles)
+                    await on_feed(feed_info, recent_articles)
+                except Exception as e:
+                    logging.error(f"Failed to process feed {feed_info['url']}: {e}")
+                finally:
+                    fetch_q.task_done()
+        
+        async with self.feed_fetcher() as fetch:
+            tasks = [asyncio.create_task(worker(fetch)) for _ in range(min(workers, len(self.feeds)))]
             try:
-                articles = self.fetch_feed(feed_info)
-                
-                # Filter recent articles with proper timezone comparison
-                recent_articles = []
-                for article in articles:
-                    try:
-                        article_date = article['published']
-                        # Ensure both dates are timezone-aware for comparison
-                        if article_date > cutoff_date:
-                            recent_articles.append(article)
-                    except Exception as e:
-                        logging.warning(f"Date comparison error for article {article.get('title', 'Unknown')}: {e}")
-                        # Include article if we can't compare dates
-                        recent_articles.append(article)
-                
-                # Limit articles per feed to avoid overwhelming
-                if len(recent_articles) > max_articles_per_feed:
-                    # Sort by publication date (newest first) before limiting
-                    recent_articles.sort(key=lambda x: x['published'], reverse=True)
-                    recent_articles = recent_articles[:max_articles_per_feed]
-                    logging.info(f"Limited to {max_articles_per_feed} most recent articles from {feed_info.get('title', feed_url)}")
-                
-                all_articles.extend(recent_articles)
-                logging.info(f"Found {len(recent_articles)} recent articles from {feed_info.get('title', feed_url)}")
-                
-            except Exception as e:
-                logging.error(f"Failed to process feed {feed_url}: {e}")
-            
-            processed_feeds += 1
+                await fetch_q.join()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
         
-        # Remove duplicates based on link or guid
-        unique_articles = self._remove_duplicates(all_articles)
+        logging.info(f"Total unique articles fetched: {total} from {len(self.feeds)} feeds")
+        return total
+    
+    def _filter_recent(self, feed_info: Dict, articles: List[Dict], cutoff_date: datetime, max_articles_per_feed: int) -> List[Dict]:
+        """Keep a feed's articles published after the cutoff, newest first up to the limit"""
+        # Filter recent articles with proper timezone comparison
+        recent_articles = []
+        for article in articles:
+            try:
+                article_date = article['published']
+                # Ensure both dates are timezone-aware for comparison
+                if article_date > cutoff_date:
+                    recent_articles.append(article)
+            except Exception as e:
+                logging.warning(f"Date comparison error for article {article.get('title', 'Unknown')}: {e}")
+                # Include article if we can't compare dates
+                recent_articles.append(article)
         
-        # Sort all articles by publication date (newest first)
+        # Limit articles per feed to avoid overwhelming; nlargest returns them newest first
+        over_limit = len(recent_articles) > max_articles_per_feed
         try:
-            unique_articles.sort(key=lambda x: x['published'], reverse=True)
+            recent_articles = heapq.nlargest(max_articles_per_feed, recent_articles, key=lambda x: x['published'])
         except Exception as e:
             logging.warning(f"Could not sort articles by date: {e}")
+            recent_articles = recent_articles[:max_articles_per_feed]
+        if over_limit:
+            logging.info(f"Limited to {max_articles_per_feed} most recent articles from {feed_info.get('title', feed_info['url'])}")
         
-        logging.info(f"Total unique articles fetched: {len(unique_articles)} from {total_feeds} feeds")
-        return unique_articles
+        return recent_articles
     
-    def _remove_duplicates(self, articles: List[Dict]) -> List[Dict]:
-        """Remove duplicate articles based on link or guid"""
-        seen = set()
-        unique_articles = []
-        
+    def _remove_duplicates(self, articles: List[Dict], seen: Optional[set] = None) -> List[Dict]:
+        """Remove duplicate articles based on link or guid, including any already in seen"""
+        # dicts keep insertion order, so the first occurrence wins
+        unique = {}
         for article in articles:
-            identifier = article.get('guid') or article.get('link', '')
-            if identifier and identifier not in seen:
-                seen.add(identifier)
-                unique_articles.append(article)
+            identifier = article.get('guid') or article.get('link')
+            if identifier and identifier not in unique and not (seen and identifier in seen):
+                unique[identifier] = article
         
-        removed_count = len(articles) - len(unique_articles)
+        removed_count = len(articles) - len(unique)
         if removed_count > 0:
             logging.info(f"Removed {removed_count} duplicate articles")
         
-        return unique_articles
+        return list(unique.values())
     
     def get_feed_statistics(self) -> Dict:
         """Get statistics about loaded feeds"""
@@ -278,8 +499,7 @@ class RSSReader:
                 ]
             }
             
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(json_structure, f, indent=2, ensure_ascii=False)
+            json_io.dump_file(json_structure, output_file)
             
             logging.info(f"Exported {len(self.feeds)} feeds to {output_file}")
             return True
@@ -1,9 +1,9 @@
 import os
+import argparse
+from functools import lru_cache
 from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
 
 load_dotenv()
-client = InferenceClient(token=os.getenv("HF_TOKEN"))
 
 # Try these QA models instead:
 qa_models = [
@@ -13,18 +13,52 @@ qa_models = [
     "microsoft/DialoGPT-medium"  # Can also do QA-style tasks
 ]
 
-def test_qa_models():
+@lru_cache(maxsize=None)
+def load_qa_pipeline(model_id):
+    """Load a local question-answering pipeline once per model"""
+    import torch
+    from transformers import pipeline
+    
+    if not torch.cuda.is_available():
+        # FP16 and 8-bit kernels need a GPU; full precision is fine for small QA models on CPU
+        return pipeline('question-answering', model=model_id)
+    
+    model_kwargs = {}
+    try:
+        import bitsandbytes  # noqa: F401
+        from transformers import BitsAndBytesConfig
+        model_kwargs['quantization_config'] = BitsAndBytesConfig(load_in_8bit=True)
+    except ImportError:
+        pass  # Half precision only
+    
+    return pipeline(
+        'question-answering',
+        model=model_id,
+        torch_dtype=torch.float16,
+        device_map='auto',
+        model_kwargs=model_kwargs
+    )
+
+@lru_cache(maxsize=None)
+def get_api_client():
+    from huggingface_hub import InferenceClient
+    return InferenceClient(token=os.getenv("HF_TOKEN"))
+
+def answer_with_api(model, question, context):
+    """Ask the Hugging Face Inference API instead of a local model"""
+    return get_api_client().question_answering(question=question, context=context, model=model)
+
+def test_qa_models(use_api=False):
     question = "What is the capital of France?"
     context = "France is a country in Europe. Paris is the capital and largest city of France."
     
     for model in qa_models:
         try:
             print(f"\nTrying model: {model}")
-            result = client.question_answering(
-                question=question,
-                context=context,
-                model=model
-            )
+            if use_api:
+                result = answer_with_api(model, question, context)
+            else:
+                result = load_qa_pipeline(model)(question=question, context=context)
             print(f"✅ Success with {model}")
             print(f"Answer: {result['answer']}")
             print(f"Score: {result['score']:.4f}")
@@ -33,4 +67,8 @@ def test_qa_models():
             print(f"❌ Failed with {model}: {e}")
             continue
 
-test_qa_models()
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Smoke-test question-answering models")
+    parser.add_argument('--api', action='store_true', help="use the Hugging Face Inference API instead of local pipelines")
+    args = parser.parse_args()
+    test_qa_models(use_api=args.api)